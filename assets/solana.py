@@ -1,8 +1,15 @@
 from datetime import datetime, timezone
-from typing import Any, Dict, List
+from pathlib import Path
+import calendar
+import json
+import math
+import os
+import tempfile
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 import aiohttp
 import asyncio
 import logging
+import orjson
 
 from batch_requestor import BatchRequestor, with_batching
 from reward import Reward
@@ -12,11 +19,90 @@ logger = logging.getLogger(__name__)
 # SOL Mainnet epoch 100's first block: 2020-10-21 15:42:21
 SOL_EPOCH_100_START_TIME = 1603254141
 EPOCH_SECONDS = 2.5 * 24 * 3600
+# Public RPC rate limit: about 40 calls per method every 10 seconds.
+RPC_CALLS_PER_WINDOW = 38
+RPC_WINDOW_SECONDS = 10
+# Number of RPC calls coalesced into a single JSON-RPC batch POST. Each call in a batch
+# counts against the rate limit, so a batch can't be larger than the window.
+RPC_BATCH_SIZE = RPC_CALLS_PER_WINDOW
+# Maximum number of block-time probes used to refine an epoch estimate.
+MAX_EPOCH_PROBES = 6
+# Worst-case drift allowed below the estimate when probing doesn't converge (~35 days).
+EPOCH_ESTIMATE_BUFFER = 14
+# Epochs shorter than this only happen during the warmup period of a cluster.
+MINIMUM_SLOTS_PER_EPOCH = 32
+
+# Epoch start times never change, so they are cached on disk across runs, keyed by RPC url.
+EPOCH_CACHE_PATH = Path.home() / ".cache" / "staking-income-calculator" / "solana_epoch_start_times.json"
+_epoch_start_times: Optional[Dict[str, Dict[int, int]]] = None
+_epoch_start_times_dirty = False
+
+def _load_epoch_start_times() -> Dict[str, Dict[int, int]]:
+  """
+  Loads the cached epoch start times, reading them from disk on first use.
+  """
+  global _epoch_start_times
+  if _epoch_start_times is None:
+    try:
+      with open(EPOCH_CACHE_PATH, "r", encoding="utf-8") as f:
+        # JSON object keys are strings; epochs are stored as their decimal form.
+        _epoch_start_times = {
+          url: {int(epoch): int(start_time) for epoch, start_time in epochs.items()}
+          for url, epochs in json.load(f).items()
+        }
+    except FileNotFoundError:
+      _epoch_start_times = {}
+    except Exception as e:
+      logger.warning(f"Ignoring unreadable epoch cache {EPOCH_CACHE_PATH}: {str(e)}")
+      _epoch_start_times = {}
+  return _epoch_start_times
+
+def _save_epoch_start_times() -> None:
+  """
+  Writes the cached epoch start times to disk, if any were added since the last write.
+  """
+  global _epoch_start_times_dirty
+  if not _epoch_start_times_dirty:
+    return
+  try:
+    EPOCH_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    # Write to a temporary file first so a crash never leaves a truncated cache behind.
+    with tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=EPOCH_CACHE_PATH.parent,
+                                     prefix=EPOCH_CACHE_PATH.name, suffix=".tmp", delete=False) as f:
+      json.dump(_load_epoch_start_times(), f)
+    os.replace(f.name, EPOCH_CACHE_PATH)
+    _epoch_start_times_dirty = False
+  except OSError as e:
+    logger.warning(f"Could not write epoch cache {EPOCH_CACHE_PATH}: {str(e)}")
 
 class Client:
   def __init__(self, base_url: str = "https://api.mainnet-beta.solana.com"):
     self.base_url = base_url
-    self.batch_requestor = BatchRequestor(batch_size=38, cooldown=10)
+    self.batch_requestor = BatchRequestor(batch_size=RPC_CALLS_PER_WINDOW, cooldown=RPC_WINDOW_SECONDS)
+    self._session: Optional[aiohttp.ClientSession] = None
+    self._epoch_schedule: Optional[Dict[str, Any]] = None
+
+  def _get_session(self) -> aiohttp.ClientSession:
+      """
+      Lazily create the pooled session shared by every RPC call of this client.
+
+      @return: aiohttp.ClientSession The shared session
+      """
+      if self._session is None or self._session.closed:
+          self._session = aiohttp.ClientSession(
+              connector=aiohttp.TCPConnector(limit=100, limit_per_host=64, ttl_dns_cache=300, enable_cleanup_closed=True),
+              timeout=aiohttp.ClientTimeout(total=60, connect=10),
+          )
+      return self._session
+
+  async def aclose(self) -> None:
+      """
+      Close the shared session, if one was opened, and stop the request batcher.
+      """
+      await self.batch_requestor.close()
+      if self._session is not None and not self._session.closed:
+          await self._session.close()
+      self._session = None
 
   async def _make_request(self, method: str, params: List[Any]) -> Dict[str, Any]:
       """
@@ -32,13 +118,52 @@ class Client:
           "method": method,
           "params": params 
       }
+      return await self._post(payload)
+
+  async def _batch_request(self, calls: List[Tuple[str, List[Any]]]) -> List[Dict[str, Any]]:
+      """
+      Send several RPC calls in a single JSON-RPC 2.0 batch POST.
       
+      @param calls: The (method, params) pairs to send
+      @return: List[Dict[str, Any]] The responses, in the same order as calls
+      """
+      payload = [
+          {"jsonrpc": "2.0", "id": i, "method": method, "params": params}
+          for i, (method, params) in enumerate(calls)
+      ]
+      responses = await self._post(payload, weight=len(calls))
+      if not isinstance(responses, list):
+          # The node rejected the batch as a whole and returned a single error object.
+          raise ValueError(f"Batch request failed: {responses.get('error')}")
+      # Batch responses may come back in any order, so line them up with the calls by id.
+      ordered: List[Optional[Dict[str, Any]]] = [None] * len(calls)
+      for response in responses:
+          response_id = response.get("id") if isinstance(response, dict) else None
+          if not isinstance(response_id, int) or not 0 <= response_id < len(calls) or ordered[response_id] is not None:
+              error = response.get("error") if isinstance(response, dict) else response
+              raise ValueError(f"Batch request returned an unexpected response (id={response_id!r}): {error}")
+          ordered[response_id] = response
+      missing = [i for i, response in enumerate(ordered) if response is None]
+      if missing:
+          raise ValueError(f"Batch request returned no response for calls {missing}")
+      return ordered
+
+  async def _post(self, payload: Any, weight: int = 1) -> Any:
+      """
+      POST a JSON-RPC payload to the Solana RPC API with rate limiting.
+      
+      @param payload: A single JSON-RPC call or a list of calls
+      @param weight: The number of calls in the payload, each counted against the rate limit
+      @return: Any The decoded response body
+      """
+      # Encoded and decoded with orjson; large batch responses are otherwise costly to parse.
+      body = orjson.dumps(payload)
+
       async def _request():
-          async with aiohttp.ClientSession() as session:
-              async with session.post(self.base_url, json=payload) as response:
-                  return await response.json()
+          async with self._get_session().post(self.base_url, data=body, headers={"Content-Type": "application/json"}) as response:
+              return orjson.loads(await response.read())
       
-      return await with_batching(self.batch_requestor, _request)
+      return await with_batching(self.batch_requestor, _request, weight=weight)
 
 
   async def get_inflation_reward(self, address: str, epoch: int) -> Dict[str, Any]:
@@ -60,13 +185,104 @@ class Client:
       @param end_epoch: The end epoch number
       @return: List[Dict[str, Any]] The list of inflation reward data
       """
+      epochs = range(start_epoch, end_epoch + 1)
       tasks = []
-      for epoch in range(start_epoch, end_epoch + 1):      
-          tasks.append(self.get_inflation_reward(address, epoch))
-      return await asyncio.gather(*tasks)
+      for i in range(0, len(epochs), RPC_BATCH_SIZE):
+          calls = [("getInflationReward", [[address], {"epoch": epoch}]) for epoch in epochs[i:i + RPC_BATCH_SIZE]]
+          tasks.append(self._batch_request(calls))
+      chunks = await asyncio.gather(*tasks)
+      return [resp for chunk in chunks for resp in chunk]
 
 
 
+  async def _get_result(self, method: str, params: List[Any]) -> Any:
+      """
+      Make a request to the Solana RPC API and unwrap its result.
+      
+      @param method: The RPC method to call
+      @param params: The parameters for the RPC method
+      @return: Any The result field of the response
+      """
+      response = await self._make_request(method=method, params=params)
+      if response.get("error"):
+          raise ValueError(f"{method} failed: {response.get('error')}")
+      return response.get("result")
+
+  async def get_first_slot_in_epoch(self, epoch: int) -> int:
+      """
+      Get the first slot of an epoch from the cluster's epoch schedule.
+      
+      @param (int) epoch: The epoch number
+      @return: int The first slot of the epoch
+      """
+      if self._epoch_schedule is None:
+          self._epoch_schedule = await self._get_result(method="getEpochSchedule", params=[])
+      schedule = self._epoch_schedule
+      if epoch < schedule["firstNormalEpoch"]:
+          # Warmup epochs double in length, starting at MINIMUM_SLOTS_PER_EPOCH.
+          return MINIMUM_SLOTS_PER_EPOCH * (2 ** epoch - 1)
+      return (epoch - schedule["firstNormalEpoch"]) * schedule["slotsPerEpoch"] + schedule["firstNormalSlot"]
+
+  async def get_epoch_start_time(self, epoch: int) -> int:
+      """
+      Get the unix time of the first block produced in an epoch.
+      
+      @param (int) epoch: The epoch number
+      @return: int The block time of the epoch's first block
+      """
+      cache = _load_epoch_start_times().setdefault(self.base_url, {})
+      if epoch in cache:
+          return cache[epoch]
+
+      first_slot = await self.get_first_slot_in_epoch(epoch)
+      # The first slot may have been skipped, so look up the first block actually produced.
+      blocks = await self._get_result(method="getBlocksWithLimit", params=[first_slot, 1])
+      if not blocks:
+          raise ValueError(f"No blocks found for epoch {epoch}")
+      start_time = await self._get_result(method="getBlockTime", params=[blocks[0]])
+      if start_time is None:
+          raise ValueError(f"No block time found for epoch {epoch}")
+
+      global _epoch_start_times_dirty
+      cache[epoch] = start_time
+      _epoch_start_times_dirty = True
+      return start_time
+
+  async def find_epoch_at(self, timestamp: int, estimate: int, current_epoch: int) -> int:
+      """
+      Find the epoch that was active at the given time by refining an estimate with block-time probes.
+      
+      @param (int) timestamp: The unix time to look up
+      @param (int) estimate: The estimated epoch to start probing from
+      @param (int) current_epoch: The current epoch, used as an upper bound
+      @return: int The epoch active at timestamp, or an earlier one (at most EPOCH_ESTIMATE_BUFFER
+          below the estimate) if probing didn't converge
+      """
+      # The answer always stays within [lo, hi].
+      lo, hi = 0, current_epoch
+      epoch = min(max(estimate, lo), hi)
+      for _ in range(MAX_EPOCH_PROBES):
+          start_time = await self.get_epoch_start_time(epoch)
+          if start_time > timestamp:
+              hi = epoch - 1
+              # Step back by the estimated number of epochs between the two times.
+              epoch -= max(1, math.ceil((start_time - timestamp) / EPOCH_SECONDS))
+          else:
+              lo = epoch
+              if epoch == current_epoch:
+                  return epoch
+              next_start_time = await self.get_epoch_start_time(epoch + 1)
+              if next_start_time > timestamp:
+                  return epoch
+              lo = epoch + 1
+              epoch += 1 + int((timestamp - next_start_time) // EPOCH_SECONDS)
+          if lo >= hi:
+              return lo
+          epoch = min(max(epoch, lo), hi)
+      # Fall back to the earliest epoch that may still contain timestamp, but no further back
+      # than the estimate's worst-case drift, rather than fetching every epoch since lo.
+      return max(lo, min(estimate - EPOCH_ESTIMATE_BUFFER, hi), 0)
+
   async def fetch_epoch_info(self, year: int):
       
       response = await self._make_request(method="getEpochInfo", params=[])
@@ -80,8 +296,12 @@ class Client:
       seconds_since_baseline = start_time - SOL_EPOCH_100_START_TIME
       start_epoch = (seconds_since_baseline // EPOCH_SECONDS) + 100
       
-      # Add some buffer in case estimates are off.
-      start_epoch -= 14 # 12 epochs ~ 30 days.
+      # Epoch lengths drift from EPOCH_SECONDS, so refine the estimate against actual block times.
+      try:
+          start_epoch = await self.find_epoch_at(int(start_time), int(start_epoch), current_epoch)
+      finally:
+          # Persist whatever was probed, even if a later probe failed.
+          _save_epoch_start_times()
       
       logger.info(f"Start epoch: {start_epoch}")
       logger.info(f"End epoch: {current_epoch}")
@@ -104,22 +324,32 @@ class Client:
           continue
         else:
           staking_rewards.extend(res[0])
-      logger.info(f"Staking rewards for {address}: {staking_rewards}")
+      logger.info(f"Fetched {len(staking_rewards)} staking rewards for {address}")
+      if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"Staking rewards for {address}: {staking_rewards}")
       # TODO: Sanity check the responses for errors.
       return staking_rewards
 
 
-def compute_staking_rewards(rewards: List[Dict[str, Any]], year: int) -> List[Reward]:
+def compute_staking_rewards(rewards: Iterable[Dict[str, Any]], year: int) -> List[Reward]:
   """
   Computes the staking rewards for the given address using SolScan's csv.
   """
-  # Filter rewards to only include the given year.
-  rewards = [r for r in rewards if datetime.fromtimestamp(int(r['Effective Time Unix']), tz=timezone.utc).year == year]
-
-  # Filter for staking rewards (yes, the typo is intentional).
-  rewards = [r for r in rewards if r['Rewad Type'] == 'Staking']
+  # Unix bounds of the given year, so rows can be filtered without decoding a datetime each.
+  start = calendar.timegm((year, 1, 1, 0, 0, 0, 0, 0, 0))
+  end = calendar.timegm((year + 1, 1, 1, 0, 0, 0, 0, 0, 0))
 
-  # Convert to Reward objects.
-  return [Reward(amount=float(r['Reward Amount']), timestamp=int(r['Effective Time Unix'])) for r in rewards]
+  staking_rewards = []
+  append = staking_rewards.append
+  for r in rewards:
+    # Filter for staking rewards (yes, the typo is intentional).
+    if r['Rewad Type'] != 'Staking':
+      continue
+    # Filter rewards to only include the given year.
+    timestamp = int(r['Effective Time Unix'])
+    if not start <= timestamp < end:
+      continue
+    append(Reward(amount=float(r['Reward Amount']), timestamp=timestamp))
+  return staking_rewards
 
 
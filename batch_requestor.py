@@ -1,113 +1,154 @@
 import asyncio
 import time
 import logging
-from typing import Optional, Callable, Any, List
+from typing import Optional, Callable, Any, Set
 from dataclasses import dataclass
 from collections import deque
+from functools import partial
 
-@dataclass
+logger = logging.getLogger(__name__)
+
+@dataclass(slots=True)
 class BatchRequest:
     func: Callable
     args: tuple
     kwargs: dict
     future: asyncio.Future
+    weight: int = 1
 
 class BatchRequestor:
     """
-    A request batcher that processes requests in batches with cooldown periods.
+    A request batcher that dispatches requests under a sliding-window rate limit.
+    
+    Submitted requests are queued and drained by a single long-lived worker task.
+    Each request is started as its own task as soon as it fits in the window, so
+    bursts below the limit go out immediately, pacing only kicks in once the limit
+    is hit, and a slow request never holds up the ones queued behind it.
     
     Attributes:
-        batch_size (int): Number of requests to process in a single batch
-        cooldown (float): Time to wait after processing a batch
+        batch_size (int): Maximum number of requests in flight at once
+        cooldown (float): Default length of the rate-limit window, in seconds
     """
     
-    def __init__(self, batch_size: int = 5, cooldown: float = 2.0):
+    def __init__(self, batch_size: int = 5, cooldown: float = 2.0,
+                 max_per_window: Optional[int] = None, window_seconds: Optional[float] = None):
         """
         Initialize the batch requestor.
         
         Args:
-            batch_size (int): Number of requests to process in a single batch
-            cooldown (float): Time to wait after processing a batch
+            batch_size (int): Maximum number of requests in flight at once
+            cooldown (float): Default length of the rate-limit window, in seconds
+            max_per_window (Optional[int]): Maximum requests started per window. Defaults to batch_size
+            window_seconds (Optional[float]): Length of the rate-limit window. Defaults to cooldown
         """
         self.batch_size = batch_size
         self.cooldown = cooldown
-        self.request_queue = deque()
+        self._max_per_window = max_per_window if max_per_window is not None else batch_size
+        self._window_seconds = window_seconds if window_seconds is not None else cooldown
+        # Start times of the requests dispatched within the current window, oldest first.
+        self._window = deque()
+        self.queue: asyncio.Queue[BatchRequest] = asyncio.Queue()
         self.logger = logging.getLogger(__name__)
-        self.processing = False
-        self.lock = asyncio.Lock()
+        self._worker_task: Optional[asyncio.Task] = None
+        self._in_flight = asyncio.Semaphore(batch_size)
+        # Strong references to running request tasks, so they aren't garbage collected.
+        self._tasks: Set[asyncio.Task] = set()
 
-    async def process_batch(self):
-        """Process requests in batches with cooldown periods."""
-        if self.processing:
-            return
-        
-        async with self.lock:
-            if self.processing:  # Double-check pattern
+    async def _acquire_slot(self, weight: int = 1):
+        """Wait until a request of the given weight fits in the rate-limit window, then claim its slots."""
+        while True:
+            now = time.monotonic()
+            # Drop requests that have aged out of the window
+            while self._window and self._window[0] <= now - self._window_seconds:
+                self._window.popleft()
+            overflow = len(self._window) + weight - self._max_per_window
+            if overflow <= 0:
+                self._window.extend([now] * weight)
                 return
-            self.processing = True
-        
-        try:
-            while self.request_queue:
-                batch = []
-                # Get up to batch_size requests
-                for _ in range(min(self.batch_size, len(self.request_queue))):
-                    if self.request_queue:
-                        batch.append(self.request_queue.popleft())
-                
-                if not batch:
-                    break
-                
-                self.logger.info(f"Processing batch of {len(batch)} requests")
-                batch_start = time.time()
-                
-                # Process the batch
-                for i, request in enumerate(batch, 1):
-                    try:
-                        self.logger.debug(f"Processing request {i}/{len(batch)} in current batch")
-                        result = await request.func(*request.args, **request.kwargs)
-                        request.future.set_result(result)
-                    except Exception as e:
-                        self.logger.error(f"Request {i}/{len(batch)} failed: {str(e)}")
-                        request.future.set_exception(e)
-                        # Continue processing other requests in the batch
-                
-                batch_duration = time.time() - batch_start
-                self.logger.info(f"Batch complete in {batch_duration:.2f}s. {len(self.request_queue)} requests remaining")
-                
-                # Wait for cooldown period before next batch
-                if self.request_queue:
-                    self.logger.info(f"Waiting {self.cooldown}s before next batch")
-                    await asyncio.sleep(self.cooldown)
-        except Exception as e:
-            self.logger.error(f"Batch processing error: {str(e)}")
-            # Mark any remaining requests in the current batch as failed
-            for request in batch:
-                if not request.future.done():
-                    request.future.set_exception(e)
-        finally:
-            self.processing = False
+            # Wait for enough of the oldest slots to age out
+            delay = self._window_seconds - (now - self._window[overflow - 1])
+            self.logger.info(f"Rate limit reached, waiting {delay:.2f}s")
+            await asyncio.sleep(delay)
+
+    async def _worker(self):
+        """Dispatch queued requests as rate limits allow, for as long as the requestor is open."""
+        while True:
+            request = await self.queue.get()
+            acquired = False
+            try:
+                await self._in_flight.acquire()
+                acquired = True
+                await self._acquire_slot(request.weight)
+            except BaseException:
+                if acquired:
+                    self._in_flight.release()
+                # The worker is being stopped; don't leave this request's submitter waiting forever
+                request.future.cancel()
+                raise
+            task = asyncio.ensure_future(request.func(*request.args, **request.kwargs))
+            self._tasks.add(task)
+            task.add_done_callback(partial(self._resolve, request))
 
-    async def submit_request(self, func: Callable, *args, **kwargs) -> Any:
+    def _resolve(self, request: BatchRequest, task: asyncio.Task):
+        """Hand a finished request task's outcome to its submitter."""
+        self._tasks.discard(task)
+        self._in_flight.release()
+        if task.cancelled():
+            request.future.cancel()
+            return
+        # Always retrieve the exception, so an abandoned request doesn't warn that it was never retrieved
+        exception = task.exception()
+        if request.future.done():
+            # The submitter gave up waiting
+            return
+        if exception is not None:
+            self.logger.error(f"Request failed: {str(exception)}")
+            request.future.set_exception(exception)
+        else:
+            request.future.set_result(task.result())
+
+    async def close(self):
+        """Stop the worker task and cancel any requests still queued or in flight."""
+        if self._worker_task is not None:
+            self._worker_task.cancel()
+            try:
+                await self._worker_task
+            except asyncio.CancelledError:
+                pass
+            self._worker_task = None
+        while not self.queue.empty():
+            self.queue.get_nowait().future.cancel()
+        for task in list(self._tasks):
+            task.cancel()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def submit_request(self, func: Callable, *args, weight: int = 1, **kwargs) -> Any:
         """
-        Submit a request to be processed in a batch.
+        Submit a request to be dispatched under the rate limit.
         
         Args:
             func (Callable): The async function to execute
             *args: Positional arguments to pass to the function
+            weight (int): Number of rate-limit slots the request uses, e.g. the
+                number of calls in a JSON-RPC batch
             **kwargs: Keyword arguments to pass to the function
             
         Returns:
             Any: The result of the function
         """
-        future = asyncio.Future()
-        request = BatchRequest(func, args, kwargs, future)
-        self.request_queue.append(request)
+        if weight > self._max_per_window:
+            raise ValueError(f"Request weight {weight} exceeds the rate limit of {self._max_per_window} per window")
+        future = asyncio.get_running_loop().create_future()
+        request = BatchRequest(func, args, kwargs, future, weight)
+        self.queue.put_nowait(request)
         
-        # Start processing if not already running
-        asyncio.create_task(self.process_batch())
+        # Start the worker on first use
+        if self._worker_task is None or self._worker_task.done():
+            self._worker_task = asyncio.create_task(self._worker())
         return await future
 
-async def with_batching(batch_requestor: BatchRequestor, func: Callable, *args, **kwargs) -> Any:
+async def with_batching(batch_requestor: BatchRequestor, func: Callable, *args, weight: int = 1, **kwargs) -> Any:
     """
     Execute a function with request batching.
     
@@ -115,20 +156,23 @@ async def with_batching(batch_requestor: BatchRequestor, func: Callable, *args,
         batch_requestor (BatchRequestor): The batch requestor to use
         func (Callable): The function to execute
         *args: Positional arguments to pass to the function
+        weight (int): Number of rate-limit slots the request uses
         **kwargs: Keyword arguments to pass to the function
         
     Returns:
         Any: The result of the function
     """
-    logger = logging.getLogger(__name__)
     task_name = f"{func.__name__}_{id(func)}"
-    logger.debug(f"Submitting batched request: {task_name}")
+    debug = logger.isEnabledFor(logging.DEBUG)
+    if debug:
+        logger.debug(f"Submitting batched request: {task_name}")
     start_time = time.time()
     
     try:
-        result = await batch_requestor.submit_request(func, *args, **kwargs)
-        duration = time.time() - start_time
-        logger.debug(f"Completed batched request: {task_name} (took {duration:.2f}s)")
+        result = await batch_requestor.submit_request(func, *args, weight=weight, **kwargs)
+        if debug:
+            duration = time.time() - start_time
+            logger.debug(f"Completed batched request: {task_name} (took {duration:.2f}s)")
         return result
     except Exception as e:
         duration = time.time() - start_time
@@ -1,16 +1,27 @@
 from datetime import datetime, timezone, timedelta
-from decimal import Decimal
+import asyncio
+from functools import partial
 import logging
 import requests
+from requests.adapters import HTTPAdapter
 from typing import List, Dict, Any
+from urllib3.util.retry import Retry
 
 from assets.solana import Client as SolanaClient, compute_staking_rewards
 from protocol import Protocol
 from reward import Reward
-from csv_loader import load_csv
+from csv_loader import load_csv_parallel
 
 logger = logging.getLogger(__name__)
 
+# Shared session so repeated CoinGecko calls reuse the pooled connection and back off on 429s.
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=8,
+    max_retries=Retry(total=3, backoff_factor=1, status_forcelist=[429, 500, 502, 503, 504]),
+))
+
 def fetch_usd_protocol_price(protocol: Protocol, year: int):
     """
     Fetches the USD price of the protocol for the given year.
@@ -31,7 +42,7 @@ def fetch_usd_protocol_price(protocol: Protocol, year: int):
         return None
 
     url = f"https://api.coingecko.com/api/v3/coins/{protocol.name}/market_chart/range?vs_currency=usd&from={start_date}&to={end_date}"
-    response = requests.get(url)
+    response = _SESSION.get(url, timeout=30)
     logger.info(f"Received response for historical prices: {response.status_code}")
     data = response.json()
    # Return sorted by timestamp.
@@ -45,7 +56,10 @@ async def fetch_staking_income_with_client(protocol: Protocol, year: int, addres
     match (protocol):
         case Protocol.SOLANA:
             client = SolanaClient()
-            return await client.fetch_staking_rewards(address, year)
+            try:
+                return await client.fetch_staking_rewards(address, year)
+            finally:
+                await client.aclose()
         case _:
             raise ValueError(f"Unsupported protocol: {protocol}")
 
@@ -57,9 +71,9 @@ def fetch_staking_income_from_file(protocol: Protocol, year: int, reward_file: s
     logger.info(f"Computing staking income for {protocol.value} in {year}")
     match (protocol):
         case Protocol.SOLANA:
-            rewards = load_csv(file_path=reward_file, has_header=True) 
-            logger.info(f"Loaded {len(rewards)} rewards")
-            return compute_staking_rewards(rewards, year)
+            rewards = load_csv_parallel(reward_file, partial(compute_staking_rewards, year=year), has_header=True)
+            logger.info(f"Loaded {len(rewards)} staking rewards")
+            return rewards
         case _:
             raise ValueError(f"Unsupported protocol: {protocol}")
     
@@ -71,22 +85,27 @@ async def calculate_staking_income(protocol: Protocol, year: int, address: str,
     Calculates the staking income for the given protocol and year.
     """
     logger.info(f"Calculating staking income for {protocol.value} in {year}")
+    if not reward_file:
+        assert address, "Address is required if reward_file is not provided"
+
+    # Prices and staking income are independent, so fetch them concurrently; the blocking
+    # calls run in worker threads to keep the event loop free.
     logger.info(f"Fetching USD prices for {protocol.value}")
-    prices = fetch_usd_protocol_price(protocol, year)
+    prices_task = asyncio.create_task(asyncio.to_thread(fetch_usd_protocol_price, protocol, year))
 
     logger.info(f"Fetching staking income for {protocol.value}")
     if reward_file:
-        staking_income = fetch_staking_income_from_file(protocol, year, reward_file)
+        income_task = asyncio.create_task(asyncio.to_thread(fetch_staking_income_from_file, protocol, year, reward_file))
     else:
-        assert address, "Address is required if reward_file is not provided"
-        staking_income = await fetch_staking_income_with_client(protocol, year, address)
+        income_task = asyncio.create_task(fetch_staking_income_with_client(protocol, year, address))
+    prices, staking_income = await asyncio.gather(prices_task, income_task)
 
     # Compute USD value for each reward.
-    for reward in staking_income:
-        # Search for USD price closest to the reward timestamp.
-        price = Reward.find_by_timestamp(prices, reward.timestamp)
+    # Search for USD price closest to each reward timestamp.
+    matched_prices = Reward.find_all_by_timestamp(prices, [reward.timestamp for reward in staking_income])
+    for reward, price in zip(staking_income, matched_prices):
         if price:
-            reward.amount_usd = Decimal(price[1]) * Decimal(f"{reward.amount:.2f}")
+            reward.amount_usd = price[1] * reward.amount
         else:
           raise ValueError(f"No price found for {reward.timestamp}")
 
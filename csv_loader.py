@@ -1,10 +1,19 @@
 import csv
+import io
 import logging
-from typing import List, Dict, Any, Optional, Iterator
+import multiprocessing
+import os
+from typing import List, Dict, Any, Optional, Iterator, Iterable, Callable, Tuple
 from pathlib import Path
 
 logger = logging.getLogger(__name__)
 
+# Files smaller than this are processed in-process. Every spawned worker re-imports the
+# program's modules (click, requests, aiohttp, ...) and results are pickled back, which
+# costs more than serial parsing at ~10 MB even on several cores. The threshold is kept
+# deliberately high until the pool is measured on a multi-core machine.
+PARALLEL_MIN_FILE_SIZE = 200 * 1024 * 1024
+
 def skip_empty_rows(reader: Iterator[List[str]]) -> Iterator[List[str]]:
     """
     Skip empty rows from a CSV reader.
@@ -19,9 +28,32 @@ def skip_empty_rows(reader: Iterator[List[str]]) -> Iterator[List[str]]:
         if any(cell.strip() for cell in row):
             yield row
 
-def load_csv(file_path: str, has_header: bool = True, delimiter: str = ',') -> List[Dict[str, Any]]:
+def rows_to_dicts(reader: Iterable[List[str]], headers: Optional[List[str]]) -> Iterator[Dict[str, Any]]:
     """
-    Load data from a CSV file.
+    Convert CSV rows to dictionaries.
+    
+    Args:
+        reader (Iterable[List[str]]): The CSV rows, without the header row
+        headers (Optional[List[str]]): The column names. If None, columns are named column_<i>
+        
+    Returns:
+        Iterator[Dict[str, Any]]: Iterator of dictionaries, each representing a row
+    """
+    if headers is None:
+        for row in reader:
+            yield {f"column_{i}": value for i, value in enumerate(row)}
+        return
+    
+    num_headers = len(headers)
+    for row in reader:
+        if len(row) != num_headers:
+            logger.warning(f"Skipping row with incorrect number of columns: {row}")
+            continue
+        yield dict(zip(headers, row))
+
+def iter_csv(file_path: str, has_header: bool = True, delimiter: str = ',') -> Iterator[Dict[str, Any]]:
+    """
+    Lazily read rows from a CSV file, one dictionary at a time.
     
     Args:
         file_path (str): Path to the CSV file
@@ -29,14 +61,13 @@ def load_csv(file_path: str, has_header: bool = True, delimiter: str = ',') -> L
         delimiter (str): The delimiter character used in the CSV
         
     Returns:
-        List[Dict[str, Any]]: List of dictionaries, each representing a row
+        Iterator[Dict[str, Any]]: Iterator of dictionaries, each representing a row
     """
     file_path = Path(file_path)
     if not file_path.exists():
         raise FileNotFoundError(f"CSV file not found: {file_path}")
     
     logger.info(f"Loading CSV from {file_path}")
-    data = []
     
     try:
         with open(file_path, 'r', newline='', encoding='utf-8') as csvfile:
@@ -44,25 +75,120 @@ def load_csv(file_path: str, has_header: bool = True, delimiter: str = ',') -> L
             # Skip empty rows
             reader = skip_empty_rows(reader)
             
+            headers = None
             if has_header:
                 headers = [h.strip() for h in next(reader)]
                 logger.info(f"Headers: {headers}")
-                for row in reader:
-                    if len(row) != len(headers):
-                        logger.warning(f"Skipping row with incorrect number of columns: {row}")
-                        continue
-                    data.append(dict(zip(headers, row)))
-            else:
-                for row in reader:
-                    data.append({f"column_{i}": value for i, value in enumerate(row)})
-        
-        logger.info(f"Successfully loaded {len(data)} rows from CSV")
-        return data
+            yield from rows_to_dicts(reader, headers)
     
     except Exception as e:
         logger.error(f"Error loading CSV: {str(e)}")
         raise
 
+def load_csv(file_path: str, has_header: bool = True, delimiter: str = ',') -> List[Dict[str, Any]]:
+    """
+    Load data from a CSV file.
+    
+    Args:
+        file_path (str): Path to the CSV file
+        has_header (bool): Whether the CSV has a header row
+        delimiter (str): The delimiter character used in the CSV
+        
+    Returns:
+        List[Dict[str, Any]]: List of dictionaries, each representing a row
+    """
+    data = list(iter_csv(file_path, has_header=has_header, delimiter=delimiter))
+    logger.info(f"Successfully loaded {len(data)} rows from CSV")
+    return data
+
+def _process_csv_range(task: Tuple[str, int, int, Optional[List[str]], str, Callable]) -> List[Any]:
+    """
+    Parse the rows in a byte range of a CSV file and process them with func.
+    
+    Args:
+        task (Tuple): The file path, start and end byte offsets (both on row boundaries),
+            headers, delimiter and the function to apply to the parsed rows
+        
+    Returns:
+        List[Any]: The results of func for the range
+    """
+    file_path, start, end, headers, delimiter, func = task
+    with open(file_path, 'rb') as csvfile:
+        csvfile.seek(start)
+        text = csvfile.read(end - start).decode('utf-8')
+    reader = skip_empty_rows(csv.reader(io.StringIO(text, newline=''), delimiter=delimiter))
+    return func(rows_to_dicts(reader, headers))
+
+def load_csv_parallel(file_path: str, func: Callable[[Iterable[Dict[str, Any]]], List[Any]],
+                      workers: Optional[int] = None, chunk_bytes: int = 4 * 1024 * 1024,
+                      has_header: bool = True, delimiter: str = ',') -> List[Any]:
+    """
+    Load a CSV file and process its rows with func, in byte ranges across a process pool.
+    
+    Each worker reads, parses and processes its own range of the file, so only the
+    range offsets and func's results cross process boundaries. Ranges are split on
+    line breaks, so quoted fields must not contain newlines (true of SolScan exports).
+    Files under PARALLEL_MIN_FILE_SIZE, or that would only keep one worker busy, are
+    processed in-process instead.
+    
+    Args:
+        file_path (str): Path to the CSV file
+        func (Callable): Picklable function mapping an iterable of rows to a list of results
+        workers (Optional[int]): Number of worker processes. Defaults to the CPU count
+        chunk_bytes (int): Approximate size of the byte range handed to a worker at a time
+        has_header (bool): Whether the CSV has a header row
+        delimiter (str): The delimiter character used in the CSV
+        
+    Returns:
+        List[Any]: The concatenated results of func, in file order
+    """
+    path = Path(file_path)
+    if not path.exists():
+        raise FileNotFoundError(f"CSV file not found: {path}")
+    
+    size = path.stat().st_size
+    workers = workers or os.cpu_count() or 1
+    if size < PARALLEL_MIN_FILE_SIZE or workers <= 1:
+        return func(iter_csv(file_path, has_header=has_header, delimiter=delimiter))
+    
+    with open(path, 'rb') as csvfile:
+        headers = None
+        if has_header:
+            # The header is the first non-empty row
+            for line in iter(csvfile.readline, b''):
+                row = next(csv.reader([line.decode('utf-8')], delimiter=delimiter), [])
+                if any(cell.strip() for cell in row):
+                    headers = [h.strip() for h in row]
+                    break
+            else:
+                return func([])
+            logger.info(f"Headers: {headers}")
+        
+        # Split the body into ranges that each start at the beginning of a row
+        offsets = [csvfile.tell()]
+        while offsets[-1] + chunk_bytes < size:
+            csvfile.seek(offsets[-1] + chunk_bytes - 1)
+            csvfile.readline()
+            if csvfile.tell() >= size:
+                break
+            offsets.append(csvfile.tell())
+        offsets.append(size)
+    
+    tasks = [(str(path), start, end, headers, delimiter, func) for start, end in zip(offsets, offsets[1:])]
+    # Don't start workers that would have no range to process
+    workers = min(workers, len(tasks))
+    if workers <= 1:
+        return func(iter_csv(file_path, has_header=has_header, delimiter=delimiter))
+    
+    logger.info(f"Processing large CSV {path} in parallel with {workers} workers")
+    results = []
+    # Spawn rather than fork: callers may run this off the event loop thread while other
+    # threads (e.g. an HTTP fetch) hold locks that a forked child would inherit.
+    with multiprocessing.get_context("spawn").Pool(workers) as pool:
+        for part in pool.imap(_process_csv_range, tasks):
+            results.extend(part)
+    return results
+
 def save_csv(data: List[Dict[str, Any]], file_path: str, headers: Optional[List[str]] = None) -> None:
     """
     Save data to a CSV file.
@@ -23,8 +23,12 @@ class Protocol(Enum):
     def from_name(cls, name: str) -> 'Protocol':
         """Create a Protocol from its name."""
         name = name.lower()
-        for protocol in cls:
-            if protocol.name == name:
-                return protocol
-        raise ValueError(f"Invalid protocol name: {name}")
+        try:
+            return cls._BY_NAME[name]
+        except KeyError:
+            raise ValueError(f"Invalid protocol name: {name}") from None
+
+
+# Lookup table for Protocol.from_name; built once the enum members exist.
+Protocol._BY_NAME = {protocol.name: protocol for protocol in Protocol}
 
@@ -1,17 +1,40 @@
-from dataclasses import dataclass, field
-from decimal import Decimal
+from dataclasses import dataclass
 from typing import List, Optional
 import bisect
-import logging
 
-logger = logging.getLogger(__name__)
-
-@dataclass
+@dataclass(slots=True)
 class Reward:
     amount: float
     timestamp: int
-    amount_usd: Decimal = field(default_factory=Decimal)
+    amount_usd: float = 0.0
     
+    @staticmethod
+    def _closest_at(prices: List[tuple], idx: int, target_timestamp: int) -> tuple:
+        """
+        Pick the price closest to a timestamp, given its insertion index.
+        
+        Args:
+            prices: Non-empty list of prices sorted by timestamp
+            idx: Index of the first price at or after the target (as from bisect_left)
+            target_timestamp: The timestamp to search for
+            
+        Returns:
+            The price with the closest timestamp; ties go to the earlier price
+        """
+        # Handle edge cases
+        if idx == 0:
+            return prices[0]
+        if idx == len(prices):
+            return prices[-1]
+            
+        # Find the closest timestamp
+        left = prices[idx-1]
+        right = prices[idx]
+        
+        if abs(left[0] - target_timestamp) <= abs(right[0] - target_timestamp):
+            return left
+        return right
+
     @staticmethod
     def find_by_timestamp(prices: List[tuple], target_timestamp: int) -> Optional[tuple]:
         """
@@ -26,24 +49,38 @@ class Reward:
         """
         if not prices:
             return None
-        logger.debug(f"Finding reward by timestamp: {target_timestamp}")
 
-        # Sort prices by timestamp if not already sorted
-        sorted_prices = sorted(prices, key=lambda p: p[0])
-        
         # Find the index where the target timestamp would be inserted
-        idx = bisect.bisect_left([p[0] for p in sorted_prices], target_timestamp)
+        idx = bisect.bisect_left(prices, target_timestamp, key=lambda p: p[0])
+        return Reward._closest_at(prices, idx, target_timestamp)
+
+    @staticmethod
+    def find_all_by_timestamp(prices: List[tuple], target_timestamps: List[int]) -> List[Optional[tuple]]:
+        """
+        Find the closest price for each of several timestamps in a single sweep.
         
-        # Handle edge cases
-        if idx == 0:
-            return sorted_prices[0]
-        if idx == len(sorted_prices):
-            return sorted_prices[-1]
-            
-        # Find the closest timestamp
-        left = sorted_prices[idx-1]
-        right = sorted_prices[idx]
+        Equivalent to calling find_by_timestamp for every target, but walks the
+        prices once instead of binary searching them per target. Rewards usually
+        arrive in chronological (or reverse) order, so ordering the targets is
+        close to linear as well.
         
-        if abs(left[0] - target_timestamp) <= abs(right[0] - target_timestamp):
-            return left
-        return right
+        Args:
+            prices: List of prices sorted by timestamp
+            target_timestamps: The timestamps to search for, in any order
+            
+        Returns:
+            The closest price for each target, in the same order as the targets
+        """
+        if not prices:
+            return [None] * len(target_timestamps)
+
+        matches: List[Optional[tuple]] = [None] * len(target_timestamps)
+        n = len(prices)
+        idx = 0
+        for i in sorted(range(len(target_timestamps)), key=target_timestamps.__getitem__):
+            target_timestamp = target_timestamps[i]
+            # Advance to the first price at or after the target (same as bisect_left).
+            while idx < n and prices[idx][0] < target_timestamp:
+                idx += 1
+            matches[i] = Reward._closest_at(prices, idx, target_timestamp)
+        return matches